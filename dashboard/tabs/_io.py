@@ -0,0 +1,24 @@
+import streamlit as st
+import pandas as pd
+import os
+
+RESULTS_DIR = "data/results"
+
+@st.cache_data(show_spinner=False)
+def _read(path, mtime):
+    """Parses a result file once; `mtime` invalidates the cache when the pipeline rewrites it."""
+    if path.endswith(".arrow"):
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+def load_result(name):
+    """
+    Loads data/results/<name> through the cache. Returns None if the file is missing.
+    A single stat both checks existence and provides the cache key.
+    """
+    path = os.path.join(RESULTS_DIR, name)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    return _read(path, mtime)
@@ -1,25 +1,24 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-import os
-
-RESULTS_DIR = "data/results"
+from tabs._io import load_result
 
 def run():
     st.markdown("## 💰 Economic Impact: The 'Crowding Out' Effect")
     st.info("**Hypothesis:** Do passengers tip *less* because they have to pay the *surcharge*?")
 
-    csv_path = os.path.join(RESULTS_DIR, "tips_economics.csv")
-    if not os.path.exists(csv_path):
+    df = load_result("tips_economics.arrow")
+    if df is None:
         st.error("Data missing.")
         return
 
-    df = pd.read_csv(csv_path)
-
-    # Metrics
-    avg_tip = df['avg_tip_pct'].mean() * 100
-    avg_surcharge = df['avg_surcharge'].mean()
-    corr = df['avg_surcharge'].corr(df['avg_tip_pct'])
+    # Metrics (plain arrays; NaN rows skipped like pandas' mean/corr)
+    tip = df['avg_tip_pct'].to_numpy(dtype=float)
+    surcharge = df['avg_surcharge'].to_numpy(dtype=float)
+    valid = ~(np.isnan(tip) | np.isnan(surcharge))
+    avg_tip = np.nanmean(tip) * 100
+    avg_surcharge = np.nanmean(surcharge)
+    corr = float(np.corrcoef(surcharge[valid], tip[valid])[0, 1])
 
     c1, c2, c3 = st.columns(3)
     c1.metric("Avg Tip Rate", f"{avg_tip:.1f}%")
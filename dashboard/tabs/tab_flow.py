@@ -1,24 +1,38 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import os
+import plotly.graph_objects as go
+from tabs._io import load_result
 
-RESULTS_DIR = "data/results"
+def _speed_heatmap(df):
+    """
+    Plots the already-aggregated 7x24 (day x hour) speeds directly as a matrix,
+    so Plotly doesn't re-bin the points.
+    """
+    days = list(range(1, 8))
+    hours = list(range(24))
+    mat = (
+        df.pivot(index="day_of_week", columns="hour_of_day", values="avg_speed")
+        .reindex(index=days, columns=hours)
+        .to_numpy()
+    )
+    fig = go.Figure(go.Heatmap(
+        z=mat, x=hours, y=days, colorscale="RdYlGn", zmin=5, zmax=20,
+        colorbar=dict(title="Speed"),
+        hovertemplate="Hour: %{x}<br>Day: %{y}<br>Speed: %{z:.1f}<extra></extra>"
+    ))
+    fig.update_layout(xaxis_title="Hour", yaxis_title="Day", template="plotly_white")
+    return fig
 
 def run():
     st.markdown("## 🚦 Congestion Velocity Audit")
     st.info("**Hypothesis:** Did the toll actually speed up traffic inside Manhattan?")
 
-    path_24 = os.path.join(RESULTS_DIR, "velocity_heatmap_2024.csv")
-    path_25 = os.path.join(RESULTS_DIR, "velocity_heatmap_2025.csv")
+    df_24 = load_result("velocity_heatmap_2024.arrow")
+    df_25 = load_result("velocity_heatmap_2025.arrow")
 
-    if not os.path.exists(path_24) or not os.path.exists(path_25):
+    if df_24 is None or df_25 is None:
         st.error("⚠️ Missing analysis data. Please run 'pipeline.py' first.")
         return
 
-    df_24 = pd.read_csv(path_24)
-    df_25 = pd.read_csv(path_25)
-
     # Executive Metrics
     avg_speed_24 = df_24['avg_speed'].mean()
     avg_speed_25 = df_25['avg_speed'].mean()
@@ -40,22 +54,12 @@ def run():
     
     with col1:
         st.subheader("2024 (Before Toll)")
-        fig24 = px.density_heatmap(
-            df_24, x="hour_of_day", y="day_of_week", z="avg_speed",
-            nbinsx=24, nbinsy=7, color_continuous_scale="RdYlGn",
-            labels={'hour_of_day': 'Hour', 'day_of_week': 'Day', 'avg_speed': 'Speed'},
-            range_color=[5, 20], template="plotly_white"
-        )
+        fig24 = _speed_heatmap(df_24)
         st.plotly_chart(fig24, use_container_width=True)
 
     with col2:
         st.subheader("2025 (After Toll)")
-        fig25 = px.density_heatmap(
-            df_25, x="hour_of_day", y="day_of_week", z="avg_speed",
-            nbinsx=24, nbinsy=7, color_continuous_scale="RdYlGn",
-            labels={'hour_of_day': 'Hour', 'day_of_week': 'Day', 'avg_speed': 'Speed'},
-            range_color=[5, 20], template="plotly_white"
-        )
+        fig25 = _speed_heatmap(df_25)
         st.plotly_chart(fig25, use_container_width=True)
 
     # Conclusion
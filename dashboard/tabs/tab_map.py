@@ -1,31 +1,87 @@
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import st_folium
+import numpy as np
+import pydeck as pdk
 import geopandas as gpd
 import os
+from tabs._io import load_result
 
-RESULTS_DIR = "data/results"
 SHAPEFILE_PATH = "data/shapefiles/taxi_zones.shp"
 
+@st.cache_resource(show_spinner=False)
+def _load_zones(path):
+    """Loads the taxi zones once per server, with centroid lon/lat columns."""
+    gdf = gpd.read_file(path).to_crs(epsg=4326)
+    gdf['lon'] = gdf.geometry.centroid.x
+    gdf['lat'] = gdf.geometry.centroid.y
+    return gdf
+
+@st.cache_resource(show_spinner=False)
+def _build_map(df_border):
+    """Builds the Border Effect map once per version of the border results."""
+    gdf = _load_zones(SHAPEFILE_PATH)
+    
+    # Merge
+    merged = gdf.merge(df_border, left_on="LocationID", right_on="dropoff_loc")
+    zone_col = 'zone_x' if 'zone_x' in merged.columns else 'zone'
+
+    # Plain point table (no geometry); the browser renders all points in one WebGL layer
+    pct_change = merged['pct_change'].to_numpy()
+    surge = pct_change > 0
+    points = pd.DataFrame({
+        "lon": merged['lon'].to_numpy(),
+        "lat": merged['lat'].to_numpy(),
+        "zone": merged[zone_col].to_numpy(),
+        "pct_change": pct_change,
+        "pct_label": [f"{p:.1f}%" for p in pct_change],
+        "trips_2024": merged['trips_2024'].fillna(0).to_numpy() if 'trips_2024' in merged.columns else np.zeros(len(merged)),
+        # Color Logic: red = surge, blue = decline
+        "r": np.where(surge, 255, 75),
+        "g": 75,
+        "b": np.where(surge, 75, 255),
+    })
+
+    zones_layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=points,
+        get_position="[lon, lat]",
+        get_radius="abs(pct_change) * 30 + 200",
+        radius_min_pixels=5,
+        radius_max_pixels=40,
+        get_fill_color="[r, g, b, 150]",
+        pickable=True,
+    )
+
+    # 60th St Border Line
+    border_layer = pdk.Layer(
+        "PathLayer",
+        data=[{"path": [[-74.02, 40.764], [-73.93, 40.764]], "name": "Congestion Boundary"}],
+        get_path="path",
+        get_color=[0, 0, 0],
+        width_min_pixels=4,
+    )
+
+    return pdk.Deck(
+        layers=[border_layer, zones_layer],
+        initial_view_state=pdk.ViewState(latitude=40.775, longitude=-73.96, zoom=12),
+        tooltip={"html": "<b>{zone}</b><br>Change: {pct_label}<br>2024 Vol: {trips_2024}"},
+    )
+
 def run():
     st.markdown("## 🗺️ The Border Effect & Leakage Audit")
     st.info("**Hypothesis:** Are passengers dropping off *just outside* the zone? And are they paying the surcharge?")
 
     # --- 1. Load Data ---
-    border_path = os.path.join(RESULTS_DIR, "border_effect.csv")
-    leakage_path = os.path.join(RESULTS_DIR, "leakage_audit.csv")
-    
-    # Check if files exist
-    if not os.path.exists(border_path) or not os.path.exists(leakage_path):
-        st.error("❌ Data missing. Please run 'python pipeline.py' first.")
-        return
-
     try:
-        df_border = pd.read_csv(border_path)
-        df_leak = pd.read_csv(leakage_path)
+        df_border = load_result("border_effect.arrow")
+        df_leak = load_result("leakage_audit.arrow")
     except Exception as e:
-        st.error(f"❌ Error reading CSV files: {e}")
+        st.error(f"❌ Error reading result files: {e}")
+        return
+
+    # Check if files exist
+    if df_border is None or df_leak is None:
+        st.error("❌ Data missing. Please run 'python pipeline.py' first.")
         return
 
     # --- 2. Executive Metrics (The "Big Numbers") ---
@@ -65,39 +121,8 @@ def run():
         return
     
     try:
-        # Load Shapefile
-        gdf = gpd.read_file(SHAPEFILE_PATH).to_crs(epsg=4326)
-        gdf['lon'] = gdf.geometry.centroid.x
-        gdf['lat'] = gdf.geometry.centroid.y
-        
-        # Merge
-        merged = gdf.merge(df_border, left_on="LocationID", right_on="dropoff_loc")
-        zone_col = 'zone_x' if 'zone_x' in merged.columns else 'zone'
-
-        m = folium.Map(location=[40.775, -73.96], zoom_start=13, tiles="OpenStreetMap")
-
-        # 60th St Border Line
-        folium.PolyLine(
-            locations=[[40.764, -74.02], [40.764, -73.93]], 
-            color="black", weight=4, dash_array="10", tooltip="Congestion Boundary"
-        ).add_to(m)
-
-        for _, row in merged.iterrows():
-            pct = row['pct_change']
-            trips_24 = row.get('trips_2024', 0)
-            
-            # Color Logic
-            color = "#FF4B4B" if pct > 0 else "#4B4BFF"
-            
-            folium.CircleMarker(
-                location=[row['lat'], row['lon']],
-                radius=10 + (abs(pct)/10),
-                tooltip=f"{row[zone_col]}: {pct:.1f}%",
-                popup=folium.Popup(f"<b>{row[zone_col]}</b><br>Change: {pct:.1f}%<br>2024 Vol: {trips_24}", max_width=200),
-                color=color, fill=True, fill_color=color, fill_opacity=0.6
-            ).add_to(m)
-
-        st_folium(m, width=700, height=450)
+        deck = _build_map(df_border)
+        st.pydeck_chart(deck)
 
     except Exception as e:
         st.error(f"Map Error: {e}")
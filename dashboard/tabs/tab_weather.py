@@ -1,24 +1,23 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.express as px
-import os
-
-RESULTS_DIR = "data/results"
+from tabs._io import load_result
 
 def run():
     st.markdown("## 🌧️ The Rain Tax: Demand Elasticity")
     st.info("**Hypothesis:** Does rain force people into taxis (High Demand)? Or do they stay home (Low Demand)?")
 
-    csv_path = os.path.join(RESULTS_DIR, "weather_elasticity.csv")
-    if not os.path.exists(csv_path):
+    df = load_result("weather_elasticity.csv")
+    if df is None:
         st.error("Data missing.")
         return
 
-    df = pd.read_csv(csv_path)
-
-    # Metrics
-    corr = df['precipitation_mm'].corr(df['trip_count'])
-    wettest_day = df.loc[df['precipitation_mm'].idxmax()]
+    # Metrics (plain arrays; NaN rows skipped like pandas' corr/idxmax)
+    pm = df['precipitation_mm'].to_numpy(dtype=float)
+    tc = df['trip_count'].to_numpy(dtype=float)
+    valid = ~(np.isnan(pm) | np.isnan(tc))
+    corr = float(np.corrcoef(pm[valid], tc[valid])[0, 1])
+    wettest_day = df.iloc[int(np.nanargmax(pm))]
     
     c1, c2, c3 = st.columns(3)
     c1.metric("Rain Elasticity", f"{corr:.3f}", help="Positive = Rain increases demand")
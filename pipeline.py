@@ -2,9 +2,29 @@ import os
 import time
 import subprocess
 import sys
+import io
+import contextlib
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from src import ingestion, processing, geospatial, analytics, weather
 from src import reporting 
 
+def _run_captured(fn):
+    """
+    Runs one analysis in a worker process. Its output is returned (not printed),
+    so the parent prints each analysis' block in order instead of interleaving them.
+    """
+    buf = io.StringIO()
+    ok = True
+    with contextlib.redirect_stdout(buf):
+        try:
+            fn()
+        except Exception:
+            traceback.print_exc(file=buf)
+            ok = False
+    return buf.getvalue(), ok
+
 def run_pipeline():
     """
     Master Orchestration Script for 2025 NYC Congestion Pricing Audit.
@@ -23,17 +43,25 @@ def run_pipeline():
     
     # 3. Download Geospatial Data
     geospatial.download_and_extract_shapefile()
+    # Warm the zone-ID cache once here, so the analytics workers below all hit it
+    geospatial.get_congestion_zone_ids()
 
-    # --- PHASE 2: Congestion Zone Impact ---
-    print("\n--- [PHASE 2] Analytics: Congestion Zone Impact ---")
-    analytics.analyze_leakage()       # Req 2: Leakage Audit
-    analytics.compare_volumes()       # Req 3: Yellow vs Green
-
-    # --- PHASE 3: Visual Audit Aggregations ---
-    print("\n--- [PHASE 3] Analytics: Visual Audit Prep ---")
-    analytics.analyze_border_effect()     # Map Data
-    analytics.analyze_velocity_heatmap()  # Flow Data
-    analytics.analyze_tips_economics()    # Economics Data
+    # --- PHASE 2 & 3: Congestion Zone Impact + Visual Audit Aggregations ---
+    # Independent of each other, so they run in parallel worker processes.
+    # "spawn" gives each worker a fresh Polars thread pool (forking after Polars has started threads can deadlock).
+    print("\n--- [PHASE 2/3] Analytics: Congestion Zone Impact & Visual Audit Prep ---")
+    analyses = [
+        analytics.analyze_leakage,          # Req 2: Leakage Audit
+        analytics.compare_volumes,          # Req 3: Yellow vs Green
+        analytics.analyze_border_effect,    # Map Data
+        analytics.analyze_velocity_heatmap, # Flow Data
+        analytics.analyze_tips_economics,   # Economics Data
+    ]
+    with ProcessPoolExecutor(max_workers=len(analyses), mp_context=multiprocessing.get_context("spawn")) as ex:
+        for fn, (log, ok) in zip(analyses, ex.map(_run_captured, analyses)):
+            print(log, end="")
+            if not ok:
+                raise RuntimeError(f"{fn.__name__} failed (traceback above).")
 
     # --- PHASE 4: The Rain Tax ---
     print("\n--- [PHASE 4] Analytics: Weather Elasticity ---")
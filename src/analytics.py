@@ -1,28 +1,42 @@
 import polars as pl
 import os
+import functools
 import glob
 from datetime import datetime
-from src.geospatial import get_congestion_zone_ids, get_zone_lookup, get_border_zone_ids
+from src.geospatial import get_congestion_zone_ids, get_zone_lookup_pl, get_border_zone_ids
+from src.storage import PARTITION_GLOB, scan
 
 # --- Configuration ---
 PROCESSED_DIR = "data/processed"
 RESULTS_DIR = "data/results"
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+@functools.lru_cache(maxsize=None)
+def ids_series(ids):
+    """
+    Zone IDs as an Int64 Series, built once per ID tuple so `is_in` reuses it.
+    """
+    return pl.Series("ids", ids, dtype=pl.Int64)
+
 # --- Load Data Safely ---
-def load_data(pattern, year=None):
+def load_data(taxi_types=("yellow", "green"), years=(2024, 2025), months=None, columns=None):
     """
-    Lazy loads parquet files. Falls back to RAW data if PROCESSED is missing for 2024.
+    Lazy loads the hive-partitioned processed data (taxi=/year=/month=).
+    Partition filters are pushed down, so excluded months are never opened.
+    `columns` limits the parquet reader to the fields the caller actually uses.
     """
-    files = glob.glob(pattern)
-    if not files:
-        # Fallback for 2024 Raw Data if processed doesn't exist yet
-        if year == 2024:
-            raw_pattern = pattern.replace(PROCESSED_DIR, "data/raw").replace("clean_", "")
-            if glob.glob(raw_pattern):
-                return pl.scan_parquet(raw_pattern)
+    pattern = os.path.join(PROCESSED_DIR, PARTITION_GLOB)
+    if not glob.glob(pattern):
         return None
-    return pl.scan_parquet(pattern)
+
+    q = scan(PROCESSED_DIR).filter(
+        pl.col("taxi").is_in(list(taxi_types)) & pl.col("year").is_in(list(years))
+    )
+    if months is not None:
+        q = q.filter(pl.col("month").is_in(list(months)))
+    if columns is not None:
+        q = q.select(columns)
+    return q
 
 def analyze_leakage():
     """
@@ -33,19 +47,17 @@ def analyze_leakage():
     print("\n🔍 Starting Leakage Audit...")
     
     try:
-        zone_ids = get_congestion_zone_ids()
+        zone_ids = ids_series(get_congestion_zone_ids())
     except Exception as e:
         print(f"   ❌ Geospatial Error: {e}")
         return
 
     # Scan 2025 Data
-    file_pattern = os.path.join(PROCESSED_DIR, "clean_*_2025*.parquet")
-    if not glob.glob(file_pattern):
-        print(f"   ❌ No processed 2025 files found at {file_pattern}")
+    q = load_data(years=[2025], columns=["pickup_time", "pickup_loc", "dropoff_loc", "congestion_surcharge"])
+    if q is None:
+        print(f"   ❌ No processed files found in {PROCESSED_DIR}")
         return
 
-    q = pl.scan_parquet(file_pattern)
-
     # Filter: Trips STARTING Outside and ENDING Inside Zone
     leakage_filter = (
         (pl.col("pickup_time") >= datetime(2025, 1, 5)) & 
@@ -58,17 +70,13 @@ def analyze_leakage():
     )
     
     # Metric A: Compliance Rate
-    stats = df_audit.select([
+    lf_stats = df_audit.select([
         pl.len().alias("total_trips"),
         pl.col("is_compliant").sum().alias("compliant_trips")
-    ]).collect()
-    
-    if stats["total_trips"][0] > 0:
-        rate = (stats["compliant_trips"][0] / stats["total_trips"][0]) * 100
-        print(f"   📊 Surcharge Compliance Rate: {rate:.2f}%")
+    ])
     
     # Metric B: Top 3 Leaky Locations
-    leakage_by_loc = (
+    lf_top = (
         df_audit
         .group_by("pickup_loc")
         .agg([
@@ -78,48 +86,51 @@ def analyze_leakage():
         .filter(pl.col("volume") > 50)
         .sort("leakage_rate", descending=True)
         .limit(3)
-    ).collect()
+    )
+
+    # Both metrics share one scan + filter of the 2025 data
+    stats, leakage_by_loc = pl.collect_all([lf_stats, lf_top])
+    
+    if stats["total_trips"][0] > 0:
+        rate = (stats["compliant_trips"][0] / stats["total_trips"][0]) * 100
+        print(f"   📊 Surcharge Compliance Rate: {rate:.2f}%")
     
     # Join with Zone Names
-    lookup = pl.from_pandas(get_zone_lookup()).with_columns(pl.col("LocationID").cast(pl.Int64))
+    lookup = get_zone_lookup_pl()
     top_leakers = leakage_by_loc.join(lookup, left_on="pickup_loc", right_on="LocationID")
     
     print("   ⚠️  Top 3 Locations with Missing Surcharges:")
     print(top_leakers.select(["zone", "leakage_rate", "volume"]))
     
-    top_leakers.write_csv(f"{RESULTS_DIR}/leakage_audit.csv")
+    top_leakers.write_ipc(f"{RESULTS_DIR}/leakage_audit.arrow", compression="zstd")
 
 def compare_volumes():
     """
     Yellow vs Green Decline (Q1 2024 vs Q1 2025).
     """
     print("\n📉 Starting Volume Decline Analysis (Yellow vs Green)...")
-    zone_ids = get_congestion_zone_ids()
-    results = []
-
-    for taxi_type in ["yellow", "green"]:
-        for year in [2024, 2025]:
-            # Pattern for Q1 (Jan, Feb, Mar) only
-            pattern = os.path.join(PROCESSED_DIR, f"clean_{taxi_type}_*{year}-0[1-3]*.parquet")
-            q = load_data(pattern, year)
-            
-            if q is None: continue
-
-            # Handle 2024 Raw Schema if fallback used
-            if "clean" not in str(q) and "DOLocationID" in q.columns:
-                 q = q.rename({"DOLocationID": "dropoff_loc"})
-
-            volume = (
-                q.filter(pl.col("dropoff_loc").is_in(zone_ids))
-                .select(pl.len())
-                .collect()
-                .item()
-            )
-            results.append({"Taxi Type": taxi_type, "Year": year, "Volume": volume})
-            print(f"   🗓️  {taxi_type} Q1 {year}: {volume:,} trips")
+    zone_ids = ids_series(get_congestion_zone_ids())
+
+    # Q1 (Jan, Feb, Mar) only; both taxi types and years in one plan
+    q = load_data(["yellow", "green"], [2024, 2025], months=[1, 2, 3], columns=["taxi", "year", "dropoff_loc"])
+    if q is None:
+        print(f"   ❌ No processed files found in {PROCESSED_DIR}")
+        return
+
+    results = (
+        q.filter(pl.col("dropoff_loc").is_in(zone_ids))
+        .group_by(["taxi", "year"])
+        .agg(pl.len().alias("Volume"))
+        .sort(["taxi", "year"], descending=[True, False])
+        .rename({"taxi": "Taxi Type", "year": "Year"})
+        .collect()
+    )
+
+    for taxi_type, year, volume in results.iter_rows():
+        print(f"   🗓️  {taxi_type} Q1 {year}: {volume:,} trips")
 
     # Save Results
-    pl.DataFrame(results).write_csv(f"{RESULTS_DIR}/volume_comparison.csv")
+    results.write_ipc(f"{RESULTS_DIR}/volume_comparison.arrow", compression="zstd")
 
 def analyze_border_effect():
     """
@@ -128,87 +139,84 @@ def analyze_border_effect():
     """
     print("\n🗺️  Starting Border Effect Analysis (Full Year Comparison)...")
     border_ids = get_border_zone_ids()
-    results = []
-
-    for year in [2024, 2025]:
-        pattern = os.path.join(PROCESSED_DIR, f"clean_yellow_tripdata_{year}-*.parquet")
-        q = load_data(pattern, year)
-        
-        if q is None:
-            print(f"   ⚠️ No data for {year}. Using dummy 0.")
-            agg = pl.DataFrame({"dropoff_loc": border_ids, f"trips_{year}": [0]*len(border_ids)})
-        else:
-            if "clean" not in str(q) and "DOLocationID" in q.columns:
-                 q = q.rename({"DOLocationID": "dropoff_loc"})
-
-            agg = (
-                q.filter(pl.col("dropoff_loc").is_in(border_ids))
-                .group_by("dropoff_loc")
-                .agg(pl.len().alias(f"trips_{year}"))
-                .collect()
-            )
-        results.append(agg)
-
-    if len(results) == 2:
-        df_24, df_25 = results
-        joined = df_24.join(df_25, on="dropoff_loc", how="outer").fill_null(0)
-        
-        # Calculate % Change with safe division
-        final_df = joined.with_columns(
-            pl.when(pl.col("trips_2024") > 50)
-            .then(((pl.col("trips_2025") - pl.col("trips_2024")) / pl.col("trips_2024")) * 100)
-            .otherwise(0.0)
-            .alias("pct_change")
+
+    # One scan over both years; each year's count is a conditional sum
+    q = load_data(["yellow"], [2024, 2025], columns=["year", "dropoff_loc"])
+
+    if q is None:
+        print("   ⚠️ No data for 2024/2025. Using dummy 0.")
+        joined = pl.DataFrame({
+            "dropoff_loc": list(border_ids), "trips_2024": [0]*len(border_ids), "trips_2025": [0]*len(border_ids)
+        })
+    else:
+        year = pl.col("year")
+        joined = (
+            q.filter(pl.col("dropoff_loc").is_in(ids_series(border_ids)))
+            .group_by("dropoff_loc")
+            .agg([
+                # Signed counts: the UInt32 sums would wrap around when trips fall
+                (year == 2024).sum().cast(pl.Int64).alias("trips_2024"),
+                (year == 2025).sum().cast(pl.Int64).alias("trips_2025")
+            ])
+            .collect(streaming=True)
         )
 
-        lookup = pl.from_pandas(get_zone_lookup()).with_columns(pl.col("LocationID").cast(pl.Int64))
-        final_df = final_df.join(lookup, left_on="dropoff_loc", right_on="LocationID")
-        
-        print("   ✅ Calculated Border Effect.")
-        final_df.write_csv(f"{RESULTS_DIR}/border_effect.csv")
+    # Calculate % Change with safe division
+    final_df = joined.with_columns(
+        pl.when(pl.col("trips_2024") > 50)
+        .then(((pl.col("trips_2025") - pl.col("trips_2024")) / pl.col("trips_2024")) * 100)
+        .otherwise(0.0)
+        .alias("pct_change")
+    )
+
+    lookup = get_zone_lookup_pl()
+    final_df = final_df.join(lookup, left_on="dropoff_loc", right_on="LocationID")
+    
+    print("   ✅ Calculated Border Effect.")
+    final_df.write_ipc(f"{RESULTS_DIR}/border_effect.arrow", compression="zstd")
 
 def analyze_velocity_heatmap():
     """
     Visual Audit 2: Congestion Velocity Heatmap (Q1 24 vs Q1 25).
     """
     print("\n🚦 Starting Congestion Velocity Analysis...")
-    zone_ids = get_congestion_zone_ids()
+    zone_ids = ids_series(get_congestion_zone_ids())
     
-    for year in [2024, 2025]:
-        pattern = os.path.join(PROCESSED_DIR, f"clean_yellow_tripdata_{year}-0[1-3]*.parquet")
-        q = load_data(pattern, year)
-        if q is None: continue
-
-        if "clean" not in str(q):
-            # Raw schema mapping
-            q = q.rename({
-                "tpep_pickup_datetime": "pickup_time", "tpep_dropoff_datetime": "dropoff_time",
-                "PULocationID": "pickup_loc", "DOLocationID": "dropoff_loc"
-            })
-
-        # Filter: Internal Zone Trips Only
-        internal = q.filter(
-            (pl.col("pickup_loc").is_in(zone_ids)) & (pl.col("dropoff_loc").is_in(zone_ids))
-        )
+    # Q1 of both years in one plan, keyed by the year partition
+    q = load_data(
+        ["yellow"], [2024, 2025], months=[1, 2, 3],
+        columns=["year", "pickup_time", "dropoff_time", "pickup_loc", "dropoff_loc", "trip_distance"]
+    )
+    if q is None:
+        print("   ⚠️ No Q1 data found. Skipping heatmap.")
+        return
 
-        # Recalculate Speed
-        speed_df = internal.with_columns(
-            ((pl.col("dropoff_time") - pl.col("pickup_time")).dt.total_seconds() / 3600).alias("duration_hours")
-        ).filter(pl.col("duration_hours") > 0.05).with_columns(
-            (pl.col("trip_distance") / pl.col("duration_hours")).alias("speed_mph")
-        )
+    # Filter: Internal Zone Trips Only
+    internal = q.filter(
+        (pl.col("pickup_loc").is_in(zone_ids)) & (pl.col("dropoff_loc").is_in(zone_ids))
+    )
 
-        heatmap = (
-            speed_df.with_columns([
-                pl.col("pickup_time").dt.weekday().alias("day_of_week"),
-                pl.col("pickup_time").dt.hour().alias("hour_of_day")
-            ])
-            .group_by(["day_of_week", "hour_of_day"])
-            .agg(pl.col("speed_mph").mean().alias("avg_speed"))
-            .sort(["day_of_week", "hour_of_day"])
-            .collect()
-        )
-        heatmap.write_csv(f"{RESULTS_DIR}/velocity_heatmap_{year}.csv")
+    # Recalculate Speed
+    speed_df = internal.with_columns(
+        ((pl.col("dropoff_time") - pl.col("pickup_time")).dt.total_seconds() / 3600).alias("duration_hours")
+    ).filter(pl.col("duration_hours") > 0.05).with_columns(
+        (pl.col("trip_distance") / pl.col("duration_hours")).alias("speed_mph")
+    )
+
+    heatmap = (
+        speed_df.with_columns([
+            pl.col("pickup_time").dt.weekday().alias("day_of_week"),
+            pl.col("pickup_time").dt.hour().alias("hour_of_day")
+        ])
+        .group_by(["year", "day_of_week", "hour_of_day"])
+        .agg(pl.col("speed_mph").mean().alias("avg_speed"))
+        .sort(["year", "day_of_week", "hour_of_day"])
+        .collect(streaming=True)
+    )
+
+    for part in heatmap.partition_by("year"):
+        year = part["year"][0]
+        part.drop("year").write_ipc(f"{RESULTS_DIR}/velocity_heatmap_{year}.arrow", compression="zstd")
         print(f"   ✅ Generated Heatmap for {year}")
 
 def analyze_tips_economics():
@@ -216,7 +224,10 @@ def analyze_tips_economics():
     Visual Audit 3: Tip Crowding Out.
     """
     print("\n💰 Starting Tip Economics Analysis...")
-    q = pl.scan_parquet(os.path.join(PROCESSED_DIR, "clean_yellow_tripdata_2025*.parquet"))
+    q = load_data(["yellow"], [2025], columns=["pickup_time", "fare", "tip_amount", "congestion_surcharge"])
+    if q is None:
+        print("   ⚠️ Tip Analysis skipped: no processed 2025 data.")
+        return
     
     try:
         monthly_stats = (
@@ -231,9 +242,9 @@ def analyze_tips_economics():
                 pl.col("tip_percent").mean().alias("avg_tip_pct")
             ])
             .sort("month")
-            .collect()
+            .collect(streaming=True)
         )
-        monthly_stats.write_csv(f"{RESULTS_DIR}/tips_economics.csv")
+        monthly_stats.write_ipc(f"{RESULTS_DIR}/tips_economics.arrow", compression="zstd")
         print("   ✅ Calculated Tip Economics")
     except Exception as e:
         print(f"   ⚠️ Tip Analysis skipped: {e}")
@@ -1,21 +1,29 @@
 import os
+import json
+import functools
 import requests
 import zipfile
 import geopandas as gpd
+import polars as pl
 from shapely.geometry import Point
 
 # --- Configuration ---
 SHAPEFILE_URL = "https://d37ci6vzurychx.cloudfront.net/misc/taxi_zones.zip"
 DATA_DIR = "data/shapefiles"
 SHAPEFILE_PATH = os.path.join(DATA_DIR, "taxi_zones.shp")
+ZONE_IDS_CACHE = os.path.join(DATA_DIR, "zone_ids.json")
 
 # Latitude of 60th Street (Approximate cutoff for Congestion Zone)
 # Any Manhattan zone with a centroid BELOW this latitude is "In the Zone"
 LATITUDE_CUTOFF_60TH_ST = 40.764 
+# Northern edge of the "Border" buffer zone just above 60th St
+BORDER_LATITUDE_CUTOFF = 40.790
 
+@functools.lru_cache(maxsize=1)
 def download_and_extract_shapefile():
     """
     Downloads the official NYC Taxi Zones Shapefile and unzips it.
+    Cached, so repeated calls within a process skip the filesystem checks.
     """
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
@@ -25,9 +33,19 @@ def download_and_extract_shapefile():
     # 1. Download if missing
     if not os.path.exists(zip_path):
         print("⬇️  Downloading Taxi Zone Shapefile...")
-        r = requests.get(SHAPEFILE_URL)
-        with open(zip_path, 'wb') as f:
-            f.write(r.content)
+        # Stream in 64 KiB chunks so the zip is never held fully in memory.
+        # Write to a temp file and swap it in, so a dropped connection never leaves a truncated zip
+        tmp_path = f"{zip_path}.{os.getpid()}.tmp"
+        try:
+            with requests.get(SHAPEFILE_URL, stream=True, timeout=30) as r:
+                r.raise_for_status()
+                with open(tmp_path, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+            os.replace(tmp_path, zip_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     # 2. Extract if .shp file is missing
     if not os.path.exists(SHAPEFILE_PATH):
@@ -37,59 +55,96 @@ def download_and_extract_shapefile():
             
     print("✅ Geospatial Data Ready.")
 
-def get_congestion_zone_ids():
+@functools.lru_cache(maxsize=1)
+def _load_zones():
     """
-    Dynamically identifies Zone IDs by calculating their geometric centroid.
-    Logic: Borough == 'Manhattan' AND Centroid Latitude < 60th St.
+    Loads the shapefile once per process.
+    Returns (all zones, Manhattan zones with centroid 'latitude').
     """
     # Ensure data exists
     download_and_extract_shapefile()
-    
+
     # 1. Load Shapefile using Geopandas
     gdf = gpd.read_file(SHAPEFILE_PATH)
-    
-    # 2. Filter for Manhattan
-    manhattan_zones = gdf[gdf['borough'] == 'Manhattan'].copy()
-    
-    # 3. Calculate Centroids (Center point of each zone)
-    manhattan_zones['centroid'] = manhattan_zones.geometry.centroid.to_crs(epsg=4326)
-    manhattan_zones['latitude'] = manhattan_zones['centroid'].y
-    
-    # 4. Apply the "South of 60th St" Cutoff
-    congestion_zones = manhattan_zones[manhattan_zones['latitude'] < LATITUDE_CUTOFF_60TH_ST]
-    
-    # Get the list of IDs
-    zone_ids = congestion_zones['LocationID'].tolist()
+
+    # 2. Filter for Manhattan, in a planar CRS (NY State Plane, ft) so centroids are exact
+    manhattan = gdf[gdf['borough'] == 'Manhattan'].to_crs(epsg=2263)
+
+    # 3. Calculate Centroids (Center point of each zone), then reproject to lat/lon
+    manhattan['centroid'] = manhattan.geometry.centroid.to_crs(epsg=4326)
+    manhattan['latitude'] = manhattan['centroid'].y
+
+    return gdf, manhattan
+
+@functools.lru_cache(maxsize=1)
+def _zone_id_sets():
+    """
+    Returns (congestion_ids, border_ids).
+    Persisted to ZONE_IDS_CACHE and reused while the shapefile's mtime and the latitude
+    cutoffs are unchanged, so later runs skip reading the shapefile and the centroid pass entirely.
+    """
+    download_and_extract_shapefile()
+    mtime = os.path.getmtime(SHAPEFILE_PATH)
+    cutoffs = [LATITUDE_CUTOFF_60TH_ST, BORDER_LATITUDE_CUTOFF]
+
+    try:
+        with open(ZONE_IDS_CACHE) as f:
+            cached = json.load(f)
+        if cached.get("mtime") == mtime and cached.get("cutoffs") == cutoffs:
+            return tuple(cached["congestion"]), tuple(cached["border"])
+    except (OSError, ValueError, KeyError):
+        pass  # Missing or unreadable cache: recompute below
+
+    _, manhattan = _load_zones()
+
+    # Apply the "South of 60th St" Cutoff
+    congestion_zones = manhattan[manhattan['latitude'] < LATITUDE_CUTOFF_60TH_ST]
+
+    # Border buffer: from 60th St up to BORDER_LATITUDE_CUTOFF
+    border_zones = manhattan[
+        (manhattan['latitude'] >= LATITUDE_CUTOFF_60TH_ST) & 
+        (manhattan['latitude'] < BORDER_LATITUDE_CUTOFF)
+    ]
+
+    # Get the IDs (tuple: immutable & hashable for downstream caches)
+    congestion_ids = tuple(congestion_zones['LocationID'].tolist())
+    border_ids = tuple(border_zones['LocationID'].tolist())
+
+    # Write to a temp file and swap it in, so concurrent readers never see a partial file
+    tmp_path = f"{ZONE_IDS_CACHE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"congestion": congestion_ids, "border": border_ids, "mtime": mtime, "cutoffs": cutoffs}, f)
+    os.replace(tmp_path, ZONE_IDS_CACHE)
+
+    return congestion_ids, border_ids
+
+def get_congestion_zone_ids():
+    """
+    Dynamically identifies Zone IDs by calculating their geometric centroid.
+    Logic: Borough == 'Manhattan' AND Centroid Latitude < 60th St.
+    """
+    zone_ids, _ = _zone_id_sets()
     
     print(f"🗺️  Identified {len(zone_ids)} zones inside the Congestion Zone (South of 60th St).")
     
     return zone_ids
 
-def get_zone_lookup():
-    
-    download_and_extract_shapefile()
-    gdf = gpd.read_file(SHAPEFILE_PATH)
-    return gdf[['LocationID', 'zone', 'borough']]
+@functools.lru_cache(maxsize=1)
+def get_zone_lookup_pl():
+    """
+    Zone lookup (LocationID, zone, borough) as Polars, built straight from the cached columns
+    (no pandas -> arrow round-trip). LocationID is Int64 for joins.
+    """
+    gdf, _ = _load_zones()
+    return pl.DataFrame({
+        "LocationID": gdf['LocationID'].to_numpy().astype("int64"),
+        "zone": gdf['zone'].to_numpy(),
+        "borough": gdf['borough'].to_numpy()
+    })
 
 def get_border_zone_ids():
     
-    download_and_extract_shapefile()
-    gdf = gpd.read_file(SHAPEFILE_PATH)
-    
-    # Filter for Manhattan
-    manhattan = gdf[gdf['borough'] == 'Manhattan'].copy()
-    
-    # Calculate Centroids
-    manhattan['centroid'] = manhattan.geometry.centroid.to_crs(epsg=4326)
-    manhattan['latitude'] = manhattan['centroid'].y
-    
-    # 40.764 is 60th St.
-    border_zones = manhattan[
-        (manhattan['latitude'] >= 40.764) & 
-        (manhattan['latitude'] < 40.790)
-    ]
-    
-    ids = border_zones['LocationID'].tolist()
+    _, ids = _zone_id_sets()
     print(f"🗺️  Identified {len(ids)} Border Zones (Buffer North of 60th St).")
     return ids
 
@@ -1,31 +1,55 @@
 import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import polars as pl
 from datetime import datetime, timedelta
 import glob
-import numpy as np
-import pyarrow as pa
-import pyarrow.parquet as pq
 
 # --- Configuration ---
 RAW_DIR = "data/raw"
 BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data"
 
+# Shared session: keeps TCP/TLS connections to the CDN alive across files
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
+
+# Downloads run in parallel threads; keep their log lines from interleaving
+_PRINT_LOCK = threading.Lock()
+
+def _log(msg):
+    with _PRINT_LOCK:
+        print(msg)
+
 def download_file(url, dest_path):
     if os.path.exists(dest_path):
-        print(f"   ✅ Already exists: {dest_path}")
+        _log(f"   ✅ Already exists: {dest_path}")
         return
     
-    print(f"   ⬇️  Downloading {os.path.basename(dest_path)}...")
+    fname = os.path.basename(dest_path)
+    _log(f"   ⬇️  Downloading {fname}...")
+    # Copy into a .part file and rename on success, so a failed transfer never
+    # leaves a truncated parquet that later runs would treat as "Already exists"
+    part_path = dest_path + ".part"
     try:
-        r = requests.get(url, stream=True)
-        r.raise_for_status()
-        with open(dest_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print("      ✅ Done.")
+        with _SESSION.get(url, stream=True, timeout=30) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            # Buffer-to-buffer copy in 1 MiB blocks
+            with open(part_path, 'wb') as f:
+                shutil.copyfileobj(r.raw, f, length=1 << 20)
+        os.replace(part_path, dest_path)
+        _log(f"      ✅ Done: {fname}")
     except Exception as e:
-        print(f"      ❌ Failed: {e}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        _log(f"      ❌ Failed: {fname}: {e}")
 
 def generate_imputed_december_2025():
     """
@@ -49,29 +73,33 @@ def generate_imputed_december_2025():
         download_file(url, path)
 
     try:
-        # Load data (using Pandas here for complex sampling logic)
-        df_23 = pd.read_parquet(file_2023)
-        df_24 = pd.read_parquet(file_2024)
+        # Load data (Polars: columnar sampling, no pandas BlockManager copies)
+        df_23 = pl.read_parquet(file_2023)
+        df_24 = pl.read_parquet(file_2024)
 
         # Basic Imputation Logic: Sample rows based on weights
         target_size = len(df_24)
         
-        # Take 30% from 2023, 70% from 2024
-        sample_23 = df_23.sample(n=int(target_size * 0.3), replace=True)
-        sample_24 = df_24.sample(n=int(target_size * 0.7), replace=True)
+        # Take 30% from 2023, 70% from 2024 (without replacement: no duplicated trips)
+        sample_23 = df_23.sample(n=int(target_size * 0.3), with_replacement=False, seed=42)
+        sample_24 = df_24.sample(n=int(target_size * 0.7), with_replacement=False, seed=42)
         
-        # Combine
-        imputed_df = pd.concat([sample_23, sample_24])
+        # Adjust Dates to Dec 2025: calendar-aware year shift per source (2023 +2y, 2024 +1y),
+        # so trips ending on Dec 31 roll into Jan 2026 instead of jumping back to Jan 2025
+        date_cols = ('tpep_pickup_datetime', 'tpep_dropoff_datetime')
+        sample_23, sample_24 = [
+            df.with_columns([pl.col(col).dt.offset_by(shift) for col in date_cols if col in df.columns])
+            for df, shift in ((sample_23, "2y"), (sample_24, "1y"))
+        ]
         
-        # Adjust Dates to Dec 2025
-        if 'tpep_pickup_datetime' in imputed_df.columns:
-            imputed_df['tpep_pickup_datetime'] = imputed_df['tpep_pickup_datetime'].apply(lambda x: x.replace(year=2025))
-        if 'tpep_dropoff_datetime' in imputed_df.columns:
-            imputed_df['tpep_dropoff_datetime'] = imputed_df['tpep_dropoff_datetime'].apply(lambda x: x.replace(year=2025))
+        # Combine ("diagonal" tolerates column-name drift between years, like pd.concat did)
+        imputed_df = pl.concat([sample_23, sample_24], how="diagonal_relaxed", rechunk=False)
 
         # Save
-        table = pa.Table.from_pandas(imputed_df)
-        pq.write_table(table, target_file)
+        # Straight from Polars (no Arrow table round-trip); stats + big row groups match processed files
+        imputed_df.write_parquet(
+            target_file, compression="zstd", compression_level=3, statistics=True, row_group_size=512_000
+        )
         print("   ✅ Successfully created yellow_tripdata_2025-12.parquet (Imputed)")
         
     except Exception as e:
@@ -87,27 +115,31 @@ def run_ingestion():
         
     print(f"📥 Starting Data Ingestion to {RAW_DIR}...")
 
-    # 1. Download 2025 Data (Jan-Nov) - Real Data
-    print("   --- 2025 Data (Primary) ---")
+    # 1. Build the download list
+    jobs = []
+    # 2025 Data (Jan-Nov) - Real Data (Primary)
     for month in range(1, 12): # Jan to Nov
-        month_str = f"{month:02d}"
         for taxi_type in ['yellow', 'green']:
-            fname = f"{taxi_type}_tripdata_2025-{month_str}.parquet"
-            url = f"{BASE_URL}/{fname}"
-            download_file(url, os.path.join(RAW_DIR, fname))
-
-    # 2. Impute Dec 2025
-    generate_imputed_december_2025()
-
-    # 3. Download Full 2024 Data (Baseline)
+            jobs.append((taxi_type, f"2025-{month:02d}"))
+    # Full 2024 Data (Baseline)
     # Essential for fair "Border Effect" comparison (Full Year vs Full Year)
-    print("   --- 2024 Data (Baseline) ---")
     for month in range(1, 13): # Jan to Dec (Full Year)
-        month_str = f"{month:02d}"
         for taxi_type in ['yellow', 'green']:
-            fname = f"{taxi_type}_tripdata_2024-{month_str}.parquet"
-            url = f"{BASE_URL}/{fname}"
-            download_file(url, os.path.join(RAW_DIR, fname))
+            jobs.append((taxi_type, f"2024-{month:02d}"))
+
+    # 2. Download in parallel (network-bound; requests releases the GIL during I/O)
+    print(f"   --- 2025 (Primary) + 2024 (Baseline): {len(jobs)} files ---")
+
+    def fetch(job):
+        taxi_type, period = job
+        fname = f"{taxi_type}_tripdata_{period}.parquet"
+        download_file(f"{BASE_URL}/{fname}", os.path.join(RAW_DIR, fname))
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(fetch, jobs))
+
+    # 3. Impute Dec 2025 (after the pool, so Dec 2024 is already on disk)
+    generate_imputed_december_2025()
 
     print("✅ Ingestion Complete.")
 
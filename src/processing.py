@@ -1,5 +1,7 @@
 import os
 import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import polars as pl
 
 # --- Configuration ---
@@ -11,6 +13,17 @@ AUDIT_DIR = "data/audit"
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 os.makedirs(AUDIT_DIR, exist_ok=True)
 
+# Ghost codes (UInt8 tag; 0 = clean). Labels are only attached for the audit CSV:
+# the code is the label's position, so casting to the Enum maps it (and stays streamable)
+GHOST_LABELS = [
+    "",
+    "Impossible Physics (>65mph)",
+    "Teleporter (<1min, >$20)",
+    "Stationary Ride (0mi, >$0)",
+    "Time Travel (Negative Duration)",
+]
+GHOST_REASON = pl.Enum(GHOST_LABELS)
+
 def standardize_schema(df, taxi_type):
     """
     Renames columns to unified schema and ensures correct data types.
@@ -43,7 +56,9 @@ def standardize_schema(df, taxi_type):
 
     # 2. Select & Rename
     # list comprehension to select only columns that exist in the file
-    df = df.select([pl.col(k).alias(v) for k, v in rename_map.items() if k in df.columns])
+    # collect_schema() resolves the schema once instead of per `in` check
+    cols = df.collect_schema().names()
+    df = df.select([pl.col(k).alias(v) for k, v in rename_map.items() if k in cols])
 
     # 3. Force Types (Crucial for calculations to avoid errors)
     df = df.with_columns([
@@ -59,102 +74,139 @@ def standardize_schema(df, taxi_type):
 
 def apply_ghost_logic(df):
     """
-    Tags rows with a 'ghost_reason' if they fail physics checks.
+    Tags rows with a 'ghost_code' (0 = clean, see GHOST_LABELS) if they fail physics checks.
     """
-    return df.with_columns([
-        # 1. Calculate Derived Metrics (Duration in Min, Speed in MPH)
-        ((pl.col("dropoff_time") - pl.col("pickup_time")).dt.total_seconds() / 60).alias("duration_min"),
+    return df.with_columns(
+        # 1. Trip duration, computed once and shared by both derived metrics
+        (pl.col("dropoff_time") - pl.col("pickup_time")).dt.total_seconds().alias("duration_sec")
+    ).with_columns([
+        # 2. Calculate Derived Metrics (Duration in Min, Speed in MPH)
+        (pl.col("duration_sec") / 60).alias("duration_min"),
         
         # Add small epsilon (0.0001) to avoid DivisionByZero errors
-        (pl.col("trip_distance") / 
-         ((pl.col("dropoff_time") - pl.col("pickup_time")).dt.total_seconds() / 3600 + 0.0001)
-        ).alias("speed_mph")
+        (pl.col("trip_distance") / (pl.col("duration_sec") / 3600 + 0.0001)).alias("speed_mph")
     ]).with_columns(
-        # 2. Create 'ghost_reason' column using Case/When logic
+        # 3. Create 'ghost_code' column using Case/When logic
+        # A 1-byte code instead of a string label keeps the tag column tiny on the clean path
         pl.when(pl.col("speed_mph") > 65)
-        .then(pl.lit("Impossible Physics (>65mph)"))
+        .then(pl.lit(1, dtype=pl.UInt8))
         
         .when((pl.col("duration_min") < 1) & (pl.col("fare") > 20))
-        .then(pl.lit("Teleporter (<1min, >$20)"))
+        .then(pl.lit(2, dtype=pl.UInt8))
         
         .when((pl.col("trip_distance") == 0) & (pl.col("fare") > 0))
-        .then(pl.lit("Stationary Ride (0mi, >$0)"))
+        .then(pl.lit(3, dtype=pl.UInt8))
         
         .when(pl.col("duration_min") < 0)
-        .then(pl.lit("Time Travel (Negative Duration)")) 
+        .then(pl.lit(4, dtype=pl.UInt8))
         
-        .otherwise(None) # Clean rows get Null
-        .alias("ghost_reason")
+        .otherwise(pl.lit(0, dtype=pl.UInt8)) # Clean rows get 0
+        .alias("ghost_code")
     )
 
-def process_data():
+def partition_dir(file_name, taxi_type):
     """
-    Main loop: Loads Raw data -> Unifies Schema -> Filters Ghosts -> Saves Clean (Parquet) & Dirty (CSV).
+    Maps 'yellow_tripdata_2025-01.parquet' to 'PROCESSED_DIR/taxi=yellow/year=2025/month=01'.
     """
-    files = sorted(glob.glob(f"{RAW_DIR}/*.parquet"))
-    print(f"🚀 Starting Processing Job for {len(files)} files...\n")
+    year, month = file_name.replace(".parquet", "").split("_")[-1].split("-")
+    out_dir = os.path.join(PROCESSED_DIR, f"taxi={taxi_type}", f"year={year}", f"month={month}")
+    os.makedirs(out_dir, exist_ok=True)
+    return out_dir
 
-    for file_path in files:
-        file_name = os.path.basename(file_path)
-        taxi_type = "yellow" if "yellow" in file_name else "green"
+def _process_one(file_path):
+    """
+    Processes a single raw file. Runs in a worker process, so log lines are
+    returned (not printed) and the parent prints each file's block in order.
+    """
+    log = []
+    file_name = os.path.basename(file_path)
+    taxi_type = "yellow" if "yellow" in file_name else "green"
+    
+    log.append(f"📄 Processing: {file_name}")
+
+    try:
+        # --- Step 1: Lazy Load & Unify ---
+        q = pl.scan_parquet(file_path, parallel="row_groups", use_statistics=True, low_memory=False, rechunk=False)
+        q = standardize_schema(q, taxi_type)
+
+        # --- Step 2: Logic ---
+        # Tag the rows lazily; every query below streams the file in chunks,
+        # so the full file is never held in memory
+        q_tagged = apply_ghost_logic(q)
+        is_clean = pl.col("ghost_code") == 0
+
+        # --- Step 3: Verification Stats ---
+        stats = q_tagged.select([
+            pl.len().alias("total"),
+            is_clean.sum().alias("clean"),
+            (~is_clean).sum().alias("ghosts")
+        ]).collect(streaming=True)
+        total_rows, clean_count, ghost_count = stats.row(0)
+
+        log.append(f"   📊 Stats: Total={total_rows} | Clean={clean_count} | Ghosts={ghost_count}")
         
-        print(f"📄 Processing: {file_name}")
-
-        try:
-            # --- Step 1: Lazy Load & Unify ---
-            q = pl.scan_parquet(file_path)
-            q = standardize_schema(q, taxi_type)
+        if total_rows != (clean_count + ghost_count):
+            log.append("   ⚠️  WARNING: Row count mismatch! Logic error possible.")
 
-            # --- Step 2: Logic ---
-            df_batch = q.collect()
+        # --- Step 4: The Split (Mutually Exclusive) & Save Outputs ---
+        
+        # A. SAVE CLEAN DATA (Keep as Parquet for Pipeline Speed)
+        # Hive layout (taxi=/year=/month=) lets readers prune partitions by filter
+        clean_out = os.path.join(partition_dir(file_name, taxi_type), "part.parquet")
+        # Clean Rows: Where code == 0; drop the temp columns to save disk space
+        # Zstd + footer statistics: smaller files, and downstream scans can prune row groups
+        q_tagged.filter(is_clean).drop(["duration_sec", "duration_min", "speed_mph", "ghost_code"]).sink_parquet(
+            clean_out, compression="zstd", compression_level=3, statistics=True, row_group_size=512_000
+        )
+        
+        # B. SAVE AUDIT LOG (Save as CSV for Human Readability)
+        if ghost_count > 0:
+            # Change extension from .parquet to .csv
+            audit_file_name = f"audit_{file_name}".replace(".parquet", ".csv")
+            audit_out = os.path.join(AUDIT_DIR, audit_file_name)
             
-            # Tag the rows
-            df_tagged = apply_ghost_logic(df_batch)
-
-            # --- Step 3: The Split (Mutually Exclusive) ---
-            # Ghost Rows: Where reason IS NOT null
-            df_ghosts = df_tagged.filter(pl.col("ghost_reason").is_not_null())
+            # Ghost Rows: Where code != 0 (codes -> readable labels on this small side only)
+            q_tagged.filter(~is_clean).select([
+                "pickup_time", "trip_distance", "fare", "duration_min", "speed_mph",
+                pl.col("ghost_code").cast(GHOST_REASON).alias("ghost_reason")
+            ]).sink_csv(audit_out)
             
-            # Clean Rows: Where reason IS null
-            df_clean = df_tagged.filter(pl.col("ghost_reason").is_null())
+            log.append(f"   🗑️  Removed {ghost_count} ghost trips -> {audit_out} (Readable CSV)")
+        else:
+            log.append("   ✅  Clean file. No ghosts found.")
 
-            # --- Step 4: Verification Stats ---
-            total_rows = len(df_tagged)
-            ghost_count = len(df_ghosts)
-            clean_count = len(df_clean)
+    except Exception as e:
+        log.append(f"   ❌ Error processing {file_name}: {e}")
+        # Optional: Print traceback for deeper debugging
+        # import traceback
+        # traceback.print_exc()
 
-            print(f"   📊 Stats: Total={total_rows} | Clean={clean_count} | Ghosts={ghost_count}")
-            
-            if total_rows != (clean_count + ghost_count):
-                print("   ⚠️  WARNING: Row count mismatch! Logic error possible.")
+    return log
 
-            # --- Step 5: Save Outputs ---
-            
-            # A. SAVE CLEAN DATA (Keep as Parquet for Pipeline Speed)
-            clean_out = os.path.join(PROCESSED_DIR, f"clean_{file_name}")
-            # Drop the temp columns to save disk space
-            df_clean.drop(["duration_min", "speed_mph", "ghost_reason"]).write_parquet(clean_out)
-            
-            # B. SAVE AUDIT LOG (Save as CSV for Human Readability)
-            if ghost_count > 0:
-                # Change extension from .parquet to .csv
-                audit_file_name = f"audit_{file_name}".replace(".parquet", ".csv")
-                audit_out = os.path.join(AUDIT_DIR, audit_file_name)
-                
-                # Write to CSV
-                df_ghosts.select([
-                    "pickup_time", "trip_distance", "fare", "duration_min", "speed_mph", "ghost_reason"
-                ]).write_csv(audit_out)
-                
-                print(f"   🗑️  Removed {ghost_count} ghost trips -> {audit_out} (Readable CSV)")
-            else:
-                print("   ✅  Clean file. No ghosts found.")
-
-        except Exception as e:
-            print(f"   ❌ Error processing {file_name}: {e}")
-            # Optional: Print traceback for deeper debugging
-            # import traceback
-            # traceback.print_exc()
+def process_data():
+    """
+    Main loop: Loads Raw data -> Unifies Schema -> Filters Ghosts -> Saves Clean (Parquet) & Dirty (CSV).
+    Files are independent, so they are processed in parallel worker processes.
+    """
+    files = sorted(glob.glob(f"{RAW_DIR}/*.parquet"))
+    print(f"🚀 Starting Processing Job for {len(files)} files...\n")
+
+    # Each worker runs its own Polars thread pool; cap it to avoid oversubscribing cores.
+    # Spawned workers inherit the environment (forking after Polars has started threads can deadlock).
+    previous = os.environ.get("POLARS_MAX_THREADS")
+    os.environ["POLARS_MAX_THREADS"] = "2"
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max(1, (os.cpu_count() or 2) // 2),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as ex:
+            for log in ex.map(_process_one, files):
+                print("\n".join(log))
+    finally:
+        if previous is None:
+            os.environ.pop("POLARS_MAX_THREADS", None)
+        else:
+            os.environ["POLARS_MAX_THREADS"] = previous
 
     print("\n✅ Processing Complete. Data is ready for Analysis.")
 
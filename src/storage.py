@@ -0,0 +1,33 @@
+import os
+import glob
+import polars as pl
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Only the partition tree: legacy flat clean_*.parquet files in the same
+# directory have no taxi/year/month columns and would break the hive scan
+PARTITION_GLOB = os.path.join("taxi=*", "year=*", "month=*", "*.parquet")
+
+# Same key dtypes Polars infers from the paths, so both scan paths yield one schema
+PARTITION_SCHEMA = pa.schema([("taxi", pa.string()), ("year", pa.int64()), ("month", pa.int64())])
+
+def scan(path):
+    """
+    Lazily scans a hive-partitioned (taxi=/year=/month=) directory of Parquet files.
+    Set REMOTE_STORAGE (e.g. data on NFS or an S3 mount) to read through pyarrow with
+    pre_buffer, which coalesces each row group's column chunks into one large request.
+    """
+    if os.getenv("REMOTE_STORAGE"):
+        fmt = ds.ParquetFileFormat(
+            default_fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=True)
+        )
+        files = sorted(glob.glob(os.path.join(path, PARTITION_GLOB)))
+        return pl.scan_pyarrow_dataset(
+            ds.dataset(files, format=fmt, partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+                       partition_base_dir=path)
+        )
+
+    return pl.scan_parquet(
+        os.path.join(path, PARTITION_GLOB), hive_partitioning=True,
+        parallel="row_groups", use_statistics=True, low_memory=False, rechunk=False
+    )
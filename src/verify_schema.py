@@ -1,14 +1,21 @@
-import polars as pl
+import pyarrow.parquet as pq
 import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
+from src.storage import PARTITION_GLOB
 
 REQUIRED_SCHEMA = {
     "pickup_time", "dropoff_time", "pickup_loc", "dropoff_loc", 
     "trip_distance", "fare", "total_amount", "congestion_surcharge"
 }
 
+def _check(f):
+    # read_schema only touches the Parquet footer (one small read per file)
+    cols = set(pq.read_schema(f).names)
+    return f, REQUIRED_SCHEMA - cols
+
 def verify():
-    files = glob.glob("data/processed/*.parquet")
+    files = glob.glob(os.path.join("data/processed", PARTITION_GLOB))
     if not files:
         print("❌ No processed files found!")
         return
@@ -16,19 +23,24 @@ def verify():
     all_pass = True
     print(f"🔍 Verifying Schema for {len(files)} files...\n")
 
-    for f in files:
-        # scan_parquet is instant (reads metadata only)
-        schema = set(pl.scan_parquet(f).columns)
-        
+    # Flat files from the old layout are skipped by every hive scan; flag them for cleanup
+    for f in glob.glob("data/processed/*.parquet"):
+        print(f"❌ FAIL: {os.path.relpath(f, 'data/processed')}")
+        print("   Legacy flat file outside the taxi=/year=/month= layout (delete it).")
+        all_pass = False
+
+    # Footer reads are I/O-bound, so check the files in parallel threads
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        results = list(ex.map(_check, files))
+
+    for f, missing in results:
         # Check if all required columns exist
-        missing = REQUIRED_SCHEMA - schema
-        
         if missing:
-            print(f"❌ FAIL: {os.path.basename(f)}")
+            print(f"❌ FAIL: {os.path.relpath(f, 'data/processed')}")
             print(f"   Missing columns: {missing}")
             all_pass = False
         else:
-            print(f"✅ PASS: {os.path.basename(f)}")
+            print(f"✅ PASS: {os.path.relpath(f, 'data/processed')}")
 
     if all_pass:
         print("\n🎉 SUCCESS: All files have the correct schema!")
@@ -36,4 +48,4 @@ def verify():
         print("\n⚠️  WARNING: Some files have incorrect schemas.")
 
 if __name__ == "__main__":
-    verify()
\ No newline at end of file
+    verify()